@@ -10,18 +10,88 @@ Authors: AI Assistant
 
 import os
 import sys
+import copy
+import pickle
+import importlib.metadata
+import importlib.util
+import multiprocessing
 import argparse
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
-# 添加 src 目錄到 Python 路徑
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# 設定檔快取: 路徑 -> ((修改時間 ns, 檔案大小), 設定內容)，設定檔未變更時略過重新解析
+_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
 
-from logger_manager import LoggerManager
-from file_processor import FileProcessor
-from report_generator import ReportGenerator
+
+class _ConfigUnpickler(pickle.Unpickler):
+    """只允許基本型別的 Unpickler，拒絕載入任何類別或函式，避免快取檔被竄改後執行任意程式碼"""
+    
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"設定快取不允許載入 {module}.{name}")
+
+
+def _load_config_sidecar(config_path: str, source: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+    """
+    讀取設定檔的 pickle 快取檔 (config.yaml.pkl)
+    
+    快取內記錄產生時設定檔的 (修改時間 ns, 檔案大小)，必須與目前完全相同才使用；
+    不以「快取較新」判斷，避免設定檔被較舊的備份 (cp -p、rsync -a、解壓縮) 取代時讀到過期設定
+    
+    Args:
+        config_path: 設定檔路徑
+        source: 設定檔目前的 (修改時間 ns, 檔案大小)
+        
+    Returns:
+        Optional[Dict]: 快取內容，快取不存在、過期或損壞時回傳 None
+    """
+    pkl_path = config_path + '.pkl'
+    try:
+        with open(pkl_path, 'rb') as f:
+            cached = _ConfigUnpickler(f).load()
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    
+    if not isinstance(cached, dict) or tuple(cached.get('source') or ()) != source:
+        return None
+    config = cached.get('config')
+    return config if isinstance(config, dict) else None
+
+
+def _write_config_sidecar(config_path: str, source: Tuple[int, int], config: Dict[str, Any]):
+    """
+    將解析後的設定寫入 pickle 快取檔，寫入失敗時忽略
+    
+    快取含有明文密碼，只允許擁有者讀寫 (權限 0600)
+    """
+    pkl_path = config_path + '.pkl'
+    try:
+        fd = os.open(pkl_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'wb') as f:
+            # 覆寫舊快取時 os.open 不會變更既有權限，需另外設定
+            os.chmod(pkl_path, 0o600)
+            pickle.dump({'source': source, 'config': config}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except (OSError, pickle.PicklingError):
+        try:
+            os.remove(pkl_path)
+        except OSError:
+            pass
+
+
+def _index_extensions(config: Dict[str, Any]):
+    """
+    預先建立副檔名查詢索引 (就地寫入 config)
+    
+    - _ext_index: 類型 -> 小寫副檔名 frozenset
+    - _all_exts: 所有支援副檔名的 frozenset
+    """
+    supported_extensions = (config.get('file_settings') or {}).get('supported_extensions') or {}
+    config['_ext_index'] = {
+        file_type: frozenset(ext.lower() for ext in exts or [])
+        for file_type, exts in supported_extensions.items()
+    }
+    config['_all_exts'] = frozenset().union(*config['_ext_index'].values())
 
 
 def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
@@ -37,14 +107,33 @@ def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
     try:
         import yaml
         
-        if not os.path.exists(config_path):
+        try:
+            st = os.stat(config_path)
+        except FileNotFoundError:
             print(f"錯誤：設定檔 {config_path} 不存在")
             sys.exit(1)
         
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        cached = _CONFIG_CACHE.get(config_path)
+        if cached is not None and cached[0] == (st.st_mtime_ns, st.st_size):
+            return copy.deepcopy(cached[1])
+        
+        source = (st.st_mtime_ns, st.st_size)
+        config = _load_config_sidecar(config_path, source)
+        if config is None:
+            # 優先使用 libyaml 的 C 解析器
+            try:
+                from yaml import CSafeLoader as _Loader
+            except ImportError:
+                from yaml import SafeLoader as _Loader
+            
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = yaml.load(f, Loader=_Loader)
+            
+            _write_config_sidecar(config_path, source, config)
         
-        return config
+        _index_extensions(config)
+        _CONFIG_CACHE[config_path] = (source, config)
+        return copy.deepcopy(config)
         
     except ImportError:
         print("錯誤：PyYAML 套件未安裝")
@@ -56,30 +145,25 @@ def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
 
 def check_dependencies():
     """檢查必要的套件是否已安裝"""
-    required_packages = [
-        'msoffcrypto',
-        'pyzipper',
-        'rarfile',
-        'tqdm',
-        'yaml'
-    ]
+    # 套件發行名稱 -> 模組名稱
+    required_packages = {
+        'msoffcrypto-tool': 'msoffcrypto',
+        'pyzipper': 'pyzipper',
+        'rarfile': 'rarfile',
+        'tqdm': 'tqdm',
+        'PyYAML': 'yaml'
+    }
     
     missing_packages = []
     
-    for package in required_packages:
+    # 查詢套件中繼資料，不實際匯入 (避免執行套件的初始化程式碼)
+    for dist_name, module_name in required_packages.items():
         try:
-            if package == 'yaml':
-                import yaml
-            elif package == 'msoffcrypto':
-                import msoffcrypto
-            elif package == 'pyzipper':
-                import pyzipper
-            elif package == 'rarfile':
-                import rarfile
-            elif package == 'tqdm':
-                import tqdm
-        except ImportError:
-            missing_packages.append(package)
+            importlib.metadata.distribution(dist_name)
+        except importlib.metadata.PackageNotFoundError:
+            # 打包後的 EXE 可能沒有中繼資料，改為查找模組規格
+            if importlib.util.find_spec(module_name) is None:
+                missing_packages.append(dist_name)
     
     if missing_packages:
         print(f"錯誤：以下套件未安裝: {', '.join(missing_packages)}")
@@ -125,7 +209,7 @@ def main():
         return
     
     # 啟動 GUI 介面
-    if args.gui:
+    if getattr(args, 'gui', False):
         try:
             from gui import main as gui_main
             gui_main()
@@ -140,17 +224,23 @@ def main():
     # 載入設定檔
     config = load_config(args.config)
     
+    # 檢查輸入資料夾 (在建立日誌管理器前，避免無效執行也建立日誌檔並清理舊日誌)
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"錯誤：輸入資料夾不存在: {input_path}")
+        sys.exit(1)
+    
+    # 延後匯入處理模組，--help / --check-deps 不需負擔其匯入成本
+    from src.logger_manager import LoggerManager
+    from src.file_processor import FileProcessor, iter_matching_files
+    from src.report_generator import ReportGenerator
+    
     # 建立日誌管理器
     logger_manager = LoggerManager(config)
     logger = logger_manager.get_logger('main')
+    processor = None
     
     try:
-        # 檢查輸入資料夾
-        input_path = Path(args.input)
-        if not input_path.exists():
-            logger.error(f"輸入資料夾不存在: {input_path}")
-            sys.exit(1)
-        
         # 建立輸出資料夾
         output_path = Path(args.output)
         output_path.mkdir(exist_ok=True)
@@ -170,16 +260,22 @@ def main():
         # 建立檔案處理器
         processor = FileProcessor(config, logger)
         
-        # 根據模式處理檔案
+        # 根據模式處理檔案 (單次走訪輸入資料夾取得候選檔案)
+        ext_index = config['_ext_index']
+        recursive = processor.recursive
         if args.mode == 'extract':
             logger.info("模式: 只處理壓縮檔案 (ZIP/RAR)")
-            results = processor.process_archive_files(str(input_path), str(output_path))
+            exts = ext_index.get('zip', frozenset()) | ext_index.get('rar', frozenset())
+            files = iter_matching_files(str(input_path), exts, recursive)
+            results = processor.process_archive_files(str(input_path), str(output_path), files)
         elif args.mode == 'excel':
             logger.info("模式: 只處理 Excel 檔案")
-            results = processor.process_excel_files(str(input_path), str(output_path))
+            files = iter_matching_files(str(input_path), ext_index.get('excel', frozenset()), recursive)
+            results = processor.process_excel_files(str(input_path), str(output_path), files)
         else:  # auto
             logger.info("模式: 自動檢測檔案類型")
-            results = processor.process_files(str(input_path), str(output_path))
+            files = iter_matching_files(str(input_path), config['_all_exts'], recursive)
+            results = processor.process_files(str(input_path), str(output_path), files)
         
         # 記錄結束時間
         end_time = datetime.now()
@@ -201,11 +297,16 @@ def main():
         logger.info(f"報表檔案: {report_file}")
         
         # 顯示失敗的檔案
-        failed_files = [d for d in results['details'] if d['status'] == 'failed']
+        failed_files = results['failed_details']
         if failed_files:
-            logger.warning("失敗的檔案:")
-            for detail in failed_files:
-                logger.warning(f"  - {detail['file']}: {detail['message']}")
+            # 合併成單一日誌記錄，避免每個檔案各自觸發一次處理器寫入
+            # 限制列出的行數，避免大量失敗時摘要無限制成長
+            max_lines = config.get('log_policy', {}).get('summary_max_lines', 2000)
+            lines = ["失敗的檔案:"]
+            lines.extend(f"  - {detail['file']}: {detail['message']}" for detail in failed_files[:max_lines])
+            if len(failed_files) > max_lines:
+                lines.append(f"  ... 還有 {len(failed_files) - max_lines} 個檔案")
+            logger.warning("\n".join(lines))
         
         logger.info("=" * 60)
         logger.info("處理完成")
@@ -215,6 +316,9 @@ def main():
         logger_manager.cleanup_on_exit()
         
     except KeyboardInterrupt:
+        # 通知處理器停止，尚未開始的檔案不再處理
+        if processor is not None:
+            processor.stop()
         logger.info("使用者中斷執行")
         sys.exit(1)
     except Exception as e:
@@ -223,4 +327,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包成 EXE 後，子行程需要此呼叫才能正確啟動
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+File: src/__init__.py
+用途: Excel ZIP Unlocker 核心套件
+說明: 讓 src 以套件形式匯入 (例如 from src.file_processor import FileProcessor)
+Authors: AI Assistant
+版本: 1.0 (2025-10-03)
+"""
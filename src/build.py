@@ -11,9 +11,14 @@ Authors: AI Assistant
 import os
 import sys
 import shutil
+import argparse
 import subprocess
 from pathlib import Path
 
+# 輸出資料夾: onedir 為 dist/excel_zip_unlocker，onefile 為 dist
+ONEDIR_DIST_DIR = Path('dist') / 'excel_zip_unlocker'
+ONEFILE_DIST_DIR = Path('dist')
+
 
 def check_pyinstaller():
     """檢查 PyInstaller 是否已安裝"""
@@ -27,8 +32,13 @@ def check_pyinstaller():
         return False
 
 
-def create_spec_file():
-    """建立 PyInstaller spec 檔案"""
+def create_spec_file(onefile: bool = False):
+    """
+    建立 PyInstaller spec 檔案
+    
+    Args:
+        onefile: 是否打包成單一執行檔 (預設為 onedir，啟動較快)
+    """
     spec_content = '''# -*- mode: python ; coding: utf-8 -*-
 
 block_cipher = None
@@ -39,7 +49,6 @@ a = Analysis(
     binaries=[],
     datas=[
         ('config', 'config'),
-        ('src', 'src'),
     ],
     hiddenimports=[
         'msoffcrypto',
@@ -47,6 +56,11 @@ a = Analysis(
         'rarfile',
         'tqdm',
         'yaml',
+        'yaml._yaml',
+        'src.timestamp_utils',
+        'src.logger_manager',
+        'src.file_processor',
+        'src.report_generator',
     ],
     hookspath=[],
     hooksconfig={},
@@ -60,6 +74,12 @@ a = Analysis(
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
+%(exe_section)s'''
+    
+    if onefile:
+        exe_section = '''# onefile 打包: 解壓縮到目前工作目錄而非 %%TEMP%% (常被防毒軟體掃描而變慢)
+# 注意: 相對路徑以啟動時的工作目錄解析，不是執行檔所在資料夾；
+# 工作目錄唯讀時無法啟動，位於網路資料夾時會在該處建立 _MEI* 暫存資料夾
 exe = EXE(
     pyz,
     a.scripts,
@@ -69,11 +89,33 @@ exe = EXE(
     [],
     name='excel_zip_unlocker',
     debug=False,
-    bootloader_ignore_signals=False,
+    bootloader_ignore_signals=True,
+    strip=False,
+    upx=True,
+    upx_exclude=%(upx_exclude)r,
+    runtime_tmpdir='.',
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=None,
+)
+
+'''
+    else:
+        exe_section = '''# onedir 打包: 執行時不需先解壓縮到暫存資料夾，啟動較快
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='excel_zip_unlocker',
+    debug=False,
+    bootloader_ignore_signals=True,
     strip=False,
     upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -83,10 +125,30 @@ exe = EXE(
     icon=None,
 )
 
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    strip=False,
+    upx=True,
+    # 每次啟動都會載入的 DLL 不壓縮，避免解壓縮拖慢啟動
+    upx_exclude=%(upx_exclude)r,
+    name='excel_zip_unlocker',
+)
+
 '''
     
+    upx_exclude = [
+        'vcruntime140.dll',
+        'python3.dll',
+        f'python{sys.version_info.major}{sys.version_info.minor}.dll',
+        'tcl86t.dll',
+        'tk86t.dll',
+    ]
+    
     with open('excel_zip_unlocker.spec', 'w', encoding='utf-8') as f:
-        f.write(spec_content)
+        f.write(spec_content % {'exe_section': exe_section % {'upx_exclude': upx_exclude}})
     
     print("✓ 已建立 PyInstaller spec 檔案")
 
@@ -113,9 +175,8 @@ def build_executable():
         return False
 
 
-def copy_additional_files():
+def copy_additional_files(dist_dir: Path = ONEDIR_DIST_DIR):
     """複製額外的檔案到 dist 目錄"""
-    dist_dir = Path('dist')
     if not dist_dir.exists():
         return
     
@@ -141,9 +202,8 @@ def copy_additional_files():
             print(f"✓ 已複製檔案: {readme}")
 
 
-def create_powershell_files():
+def create_powershell_files(dist_dir: Path = ONEDIR_DIST_DIR):
     """建立 PowerShell 執行檔案"""
-    dist_dir = Path('dist')
     if not dist_dir.exists():
         return
     
@@ -169,6 +229,13 @@ try {
 
 def main():
     """主程式"""
+    parser = argparse.ArgumentParser(description='Excel ZIP Unlocker 打包腳本')
+    parser.add_argument('--onefile', action='store_true',
+                        help='打包成單一執行檔 (預設為 onedir，啟動較快)')
+    args = parser.parse_args()
+    
+    dist_dir = ONEFILE_DIST_DIR if args.onefile else ONEDIR_DIST_DIR
+    
     print("Excel ZIP Unlocker 打包腳本")
     print("=" * 40)
     
@@ -177,21 +244,21 @@ def main():
         return
     
     # 建立 spec 檔案
-    create_spec_file()
+    create_spec_file(onefile=args.onefile)
     
     # 打包
     if not build_executable():
         return
     
     # 複製額外檔案
-    copy_additional_files()
+    copy_additional_files(dist_dir)
     
     # 建立 PowerShell 檔案
-    create_powershell_files()
+    create_powershell_files(dist_dir)
     
     print("\n" + "=" * 40)
     print("打包完成！")
-    print("可執行檔案位於 dist/ 目錄中")
+    print(f"可執行檔案位於 {dist_dir.as_posix()}/ 目錄中")
     print("- excel_zip_unlocker.exe (命令行版本)")
     print("- run.ps1 (執行腳本)")
 
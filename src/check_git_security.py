@@ -9,10 +9,49 @@ Authors: AI Assistant
 """
 
 import os
+import re
 import sys
+import fnmatch
 import subprocess
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+try:
+    import pygit2
+except ImportError:
+    # 未安裝 pygit2 時改用 git 命令列 (選用的開發工具套件，不列入 requirements.txt: pip install pygit2)
+    pygit2 = None
+
+
+# Git 查詢命令: 一次取得所需資料，以 NUL 分隔輸出
+GIT_QUERIES = {
+    'tracked': ['git', 'ls-files', '-z', '--cached'],
+    'staged': ['git', 'diff', '--cached', '-z', '--name-only'],
+}
+
+# 工作目錄中視為敏感的副檔名
+SENSITIVE_EXTS = frozenset({'.xlsx', '.xls', '.zip', '.rar', '.log', '.yaml', '.json'})
+
+# 工作目錄檢查最多收集的敏感檔案數量，避免大型資料夾耗用過多時間與記憶體
+MAX_SENSITIVE_FILES = 1000
+
+
+def _has_wildcard(pattern: str) -> bool:
+    """檢查模式是否含有 fnmatch 萬用字元"""
+    return any(char in pattern for char in '*?[')
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """
+    將萬用字元模式轉為正規表示式 (保留原本逐一比對時的大小寫規則)
+    
+    - 以 * 開頭的模式 (例如 *.xlsx) 原本以字尾比對，一律區分大小寫
+    - 其他模式原本交給 fnmatch.fnmatch，會套用 os.path.normcase，在 Windows 上不分大小寫
+    """
+    regex = fnmatch.translate(pattern)
+    if os.name == 'nt' and not pattern.startswith('*'):
+        return f"(?i:{regex})"
+    return f"(?:{regex})"
 
 
 class GitSecurityChecker:
@@ -25,6 +64,7 @@ class GitSecurityChecker:
             'config/config.yaml',
             'config/*.yaml',
             'config/*.yml',
+            '*.yaml.pkl',
             '*.passwords',
             '*.keys',
             'passwords.txt',
@@ -54,26 +94,115 @@ class GitSecurityChecker:
             'tools/*.dll',
         ]
         
+        # 不含萬用字元的模式以集合直接比對，其餘合併為單一預先編譯的正規表示式
+        self._literal_patterns = frozenset(
+            pattern for pattern in self.sensitive_patterns if not _has_wildcard(pattern)
+        )
+        self._glob_re = re.compile(
+            "|".join(
+                _glob_to_regex(pattern)
+                for pattern in self.sensitive_patterns if _has_wildcard(pattern)
+            ) or r"(?!)"  # 沒有萬用字元模式時不比對任何路徑
+        )
+        
         self.warnings = []
         self.errors = []
+        
+        # Git 查詢: 同時啟動並快取結果，後續檢查不需重複執行 git
+        self._git_procs: Dict[str, subprocess.Popen] = {}
+        self._git_results: Dict[str, Optional[List[str]]] = {}
+        self._git_missing = False
+        
+        # 有 pygit2 時直接讀取倉庫，不需啟動 git 子行程
+        self.repo = self._open_repository()
+    
+    def _open_repository(self):
+        """以 pygit2 開啟目前目錄所在的倉庫，無法使用時回傳 None"""
+        if pygit2 is None:
+            return None
+        try:
+            repo_path = pygit2.discover_repository(os.getcwd())
+            return pygit2.Repository(repo_path) if repo_path else None
+        except pygit2.GitError:
+            return None
+    
+    def _repo_query(self, name: str) -> List[str]:
+        """以 pygit2 執行 Git 查詢 (對應 GIT_QUERIES 的命令)"""
+        index = self.repo.index
+        if name == 'tracked':
+            return [entry.path for entry in index]
+        
+        # 暫存區: 索引與 HEAD 的差異，尚無任何提交時整個索引皆為暫存
+        if self.repo.head_is_unborn:
+            return [entry.path for entry in index]
+        diff = index.diff_to_tree(self.repo.head.peel(pygit2.Tree))
+        return [delta.new_file.path for delta in diff.deltas]
+    
+    def _is_sensitive(self, file_path: str) -> bool:
+        """檢查路徑是否符合敏感檔案模式"""
+        return file_path in self._literal_patterns or self._glob_re.match(file_path) is not None
+    
+    def _start_git_queries(self):
+        """同時啟動所有 Git 查詢 (已啟動或已有結果者略過)"""
+        if self.repo is not None:
+            return
+        for name, command in GIT_QUERIES.items():
+            if name in self._git_procs or name in self._git_results:
+                continue
+            try:
+                self._git_procs[name] = subprocess.Popen(
+                    command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+                )
+            except FileNotFoundError:
+                self._git_missing = True
+                self._git_results[name] = None
+    
+    def _git_query(self, name: str) -> Optional[List[str]]:
+        """
+        取得 Git 查詢結果
+        
+        Args:
+            name: 查詢名稱 (GIT_QUERIES 的鍵)
+            
+        Returns:
+            Optional[List[str]]: 路徑清單，Git 無法執行或不在倉庫中時為 None
+        """
+        if name not in self._git_results and self.repo is not None:
+            try:
+                self._git_results[name] = self._repo_query(name)
+            except pygit2.GitError:
+                # pygit2 讀取失敗時改用 git 命令列
+                self.repo = None
+        
+        if name not in self._git_results:
+            self._start_git_queries()
+            proc = self._git_procs.pop(name, None)
+            result = None
+            if proc is not None:
+                stdout, _ = proc.communicate()
+                if proc.returncode == 0:
+                    # -z 輸出以 NUL 分隔且不跳脫非 ASCII 路徑
+                    result = [path for path in os.fsdecode(stdout).split('\0') if path]
+            self._git_results[name] = result
+        
+        return self._git_results[name]
     
     def check_git_status(self) -> bool:
         """檢查 Git 狀態"""
         print("檢查 Git 狀態...")
         
-        try:
-            # 檢查是否在 Git 倉庫中
-            result = subprocess.run(['git', 'status'], capture_output=True, text=True)
-            if result.returncode != 0:
-                print("WARNING: 不在 Git 倉庫中")
-                return False
-            
-            print("V Git 倉庫狀態正常")
-            return True
-            
-        except FileNotFoundError:
+        # 已追蹤檔案查詢成功即表示位於 Git 倉庫中
+        tracked_files = self._git_query('tracked')
+        if self._git_missing:
             print("ERROR: Git 未安裝或不在 PATH 中")
             return False
+        
+        if tracked_files is None:
+            print("WARNING: 不在 Git 倉庫中")
+            return False
+        
+        print("V Git 倉庫狀態正常")
+        return True
     
     def check_gitignore(self) -> bool:
         """檢查 .gitignore 檔案"""
@@ -103,10 +232,14 @@ class GitSecurityChecker:
             'report/*'
         ]
         
-        missing_rules = []
-        for rule in required_rules:
-            if rule not in content:
-                missing_rules.append(rule)
+        # 逐行比對 (略過空行與註解)，避免規則出現在註解或較長的行中被誤判為存在
+        # 開頭的 / 只限定為根目錄，視為相同規則
+        rules = {
+            line.strip().lstrip('/')
+            for line in content.splitlines()
+            if line.strip() and not line.lstrip().startswith('#')
+        }
+        missing_rules = [rule for rule in required_rules if rule not in rules]
         
         if missing_rules:
             print(f"WARNING: 缺少忽略規則: {', '.join(missing_rules)}")
@@ -135,23 +268,17 @@ class GitSecurityChecker:
         
         try:
             # 取得已追蹤的檔案清單
-            result = subprocess.run(['git', 'ls-files'], capture_output=True, text=True)
-            if result.returncode != 0:
+            tracked_files = self._git_query('tracked')
+            if tracked_files is None:
                 print("ERROR: 無法取得已追蹤檔案清單")
                 return False
             
-            tracked_files = result.stdout.strip().split('\n')
-            if not tracked_files or tracked_files == ['']:
+            if not tracked_files:
                 print("V 沒有已追蹤的檔案")
                 return True
             
             # 檢查敏感檔案
-            sensitive_tracked = []
-            for file_path in tracked_files:
-                for pattern in self.sensitive_patterns:
-                    if self._match_pattern(file_path, pattern):
-                        sensitive_tracked.append(file_path)
-                        break
+            sensitive_tracked = [f for f in tracked_files if self._is_sensitive(f)]
             
             if sensitive_tracked:
                 print(f"ERROR: 發現已追蹤的敏感檔案:")
@@ -173,24 +300,17 @@ class GitSecurityChecker:
         
         try:
             # 取得暫存區檔案清單
-            result = subprocess.run(['git', 'diff', '--cached', '--name-only'], 
-                                  capture_output=True, text=True)
-            if result.returncode != 0:
+            staged_files = self._git_query('staged')
+            if staged_files is None:
                 print("ERROR: 無法取得暫存區檔案清單")
                 return False
             
-            staged_files = result.stdout.strip().split('\n')
-            if not staged_files or staged_files == ['']:
+            if not staged_files:
                 print("V 暫存區沒有檔案")
                 return True
             
             # 檢查敏感檔案
-            sensitive_staged = []
-            for file_path in staged_files:
-                for pattern in self.sensitive_patterns:
-                    if self._match_pattern(file_path, pattern):
-                        sensitive_staged.append(file_path)
-                        break
+            sensitive_staged = [f for f in staged_files if self._is_sensitive(f)]
             
             if sensitive_staged:
                 print(f"ERROR: 發現暫存區中的敏感檔案:")
@@ -220,29 +340,42 @@ class GitSecurityChecker:
             'password_list.txt'
         ]
         
+        # 直接以 lstat 探測，不建立 Path 物件也不追蹤符號連結
         for path in sensitive_paths:
-            if Path(path).exists():
-                sensitive_files.append(path)
+            try:
+                os.lstat(path)
+            except OSError:
+                continue
+            sensitive_files.append(path)
         
-        # 檢查資料夾中的敏感檔案
+        # 檢查資料夾中的敏感檔案 (os.walk 對不存在的資料夾不產生任何項目)
+        # 上限只計算資料夾中的檔案；達到上限後又找到檔案才停止走訪，數量以 "N+" 表示
         sensitive_dirs = ['input', 'output', 'logs', 'report', 'tools']
+        found_in_dirs = 0
+        truncated = False
         for dir_name in sensitive_dirs:
-            dir_path = Path(dir_name)
-            if dir_path.exists():
-                for file_path in dir_path.rglob('*'):
-                    if file_path.is_file():
-                        ext = file_path.suffix.lower()
-                        if ext in ['.xlsx', '.xls', '.zip', '.rar', '.log', '.yaml', '.json']:
-                            sensitive_files.append(str(file_path))
+            for root, _, names in os.walk(dir_name):
+                for name in names:
+                    if os.path.splitext(name)[1].lower() in SENSITIVE_EXTS:
+                        if found_in_dirs >= MAX_SENSITIVE_FILES:
+                            truncated = True
+                            break
+                        sensitive_files.append(os.path.join(root, name))
+                        found_in_dirs += 1
+                if truncated:
+                    break
+            if truncated:
+                break
         
         if sensitive_files:
+            more = '+' if truncated else ''
             print(f"WARNING: 發現工作目錄中的敏感檔案:")
             for file_path in sensitive_files[:10]:  # 只顯示前10個
                 print(f"  - {file_path}")
             if len(sensitive_files) > 10:
-                print(f"  ... 還有 {len(sensitive_files) - 10} 個檔案")
+                print(f"  ... 還有 {len(sensitive_files) - 10}{more} 個檔案")
             print("  這些檔案應該被 .gitignore 排除")
-            self.warnings.append(f"工作目錄中的敏感檔案: {len(sensitive_files)} 個")
+            self.warnings.append(f"工作目錄中的敏感檔案: {len(sensitive_files)}{more} 個")
         else:
             print("V 工作目錄中沒有敏感檔案")
         
@@ -266,25 +399,6 @@ class GitSecurityChecker:
         
         return True
     
-    def _match_pattern(self, file_path: str, pattern: str) -> bool:
-        """檢查檔案路徑是否匹配模式"""
-        if '*' not in pattern:
-            return file_path == pattern
-        
-        # 簡單的萬用字元匹配
-        if pattern.endswith('/*'):
-            prefix = pattern[:-2]
-            return file_path.startswith(prefix + '/')
-        elif pattern.startswith('*'):
-            suffix = pattern[1:]
-            return file_path.endswith(suffix)
-        elif '*' in pattern:
-            # 更複雜的匹配邏輯
-            import fnmatch
-            return fnmatch.fnmatch(file_path, pattern)
-        
-        return False
-    
     def generate_report(self) -> Dict[str, Any]:
         """生成檢查報告"""
         report = {
@@ -301,6 +415,9 @@ class GitSecurityChecker:
         print("Excel ZIP Unlocker - Git 安全檢查")
         print("=" * 50)
         
+        # 先同時啟動 Git 查詢，與其他檢查重疊執行
+        self._start_git_queries()
+        
         checks = [
             self.check_git_status,
             self.check_gitignore,
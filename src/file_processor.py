@@ -8,48 +8,323 @@ Authors: AI Assistant
 版本: 1.0 (2025-10-03)
 """
 
+import io
 import os
 import shutil
-import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, Iterator, Union
 import logging
 
 # 第三方套件
 import msoffcrypto
+from msoffcrypto.format.ooxml import OOXMLFile
+from msoffcrypto.method.ecma376_agile import ECMA376Agile
 import pyzipper
 import rarfile
 from tqdm import tqdm
 
 
+def _scandir_recursive(path: Union[str, Path], recursive: bool = True) -> Iterator[os.DirEntry]:
+    """
+    以 os.scandir 遞迴走訪資料夾，產生檔案項目
+    
+    DirEntry 已帶有檔案類型並快取 stat 結果，不需對每個項目重複呼叫 stat；
+    符號連結 (檔案或資料夾) 一律略過。recursive 為 False 時只走訪最上層
+    """
+    pending = [os.fspath(path)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except OSError:
+            continue
+
+
+def iter_matching_files(root: Union[str, Path], extensions: Iterable[str],
+                        recursive: bool = True) -> Iterator[os.DirEntry]:
+    """
+    產生資料夾 (含子資料夾) 中副檔名符合的檔案項目
+    
+    Args:
+        root: 根資料夾路徑
+        extensions: 副檔名清單 (不分大小寫)
+        recursive: 是否包含子資料夾
+        
+    Yields:
+        os.DirEntry: 符合的檔案項目
+    """
+    ext_set = frozenset(ext.lower() for ext in extensions)
+    if not ext_set:
+        return
+    
+    for entry in _scandir_recursive(root, recursive):
+        if os.path.splitext(entry.name)[1].lower() in ext_set:
+            yield entry
+
+
+def _normalize_passwords(passwords: Optional[List[Any]]) -> List[str]:
+    """
+    整理密碼清單: 轉為字串、略過空值並去除重複 (保留原順序)
+    
+    YAML 中未加引號的數字密碼 (例如 123456) 會被解析為整數，需轉回字串
+    """
+    normalized = (str(p) for p in (passwords or []) if p is not None)
+    return list(dict.fromkeys(p for p in normalized if p))
+
+
+def _probe_zip_password(zip_file: pyzipper.AESZipFile, entry: pyzipper.ZipInfo, password: bytes) -> bool:
+    """
+    以單一加密項目測試 ZIP 密碼
+    
+    讀到項目結尾才會檢查 CRC / HMAC，因此選用最小的項目以降低每次嘗試的成本
+    
+    Args:
+        zip_file: 已開啟的 ZIP 檔案
+        entry: 用來測試的加密項目
+        password: 密碼 (UTF-8 編碼)
+        
+    Returns:
+        bool: 密碼是否正確
+    """
+    try:
+        zip_file.setpassword(password)
+        with zip_file.open(entry) as fp:
+            while fp.read(65536):
+                pass
+        return True
+    except Exception:
+        return False
+
+
+def _process_in_order(handler: Callable[[Path, Path], Dict[str, Any]], files: List[Path],
+                      output_dir: Path,
+                      stop_event: Optional[threading.Event] = None) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    在同一個工作中依序處理一組檔案
+    
+    輸出名稱相同的檔案必須依序處理，避免多個工作同時寫入同一個輸出；
+    單一檔案發生例外不影響同組其他檔案，例外物件原樣回傳由呼叫端記錄
+    
+    Args:
+        handler: 單一檔案的處理函式
+        files: 檔案清單
+        output_dir: 輸出資料夾
+        stop_event: 停止事件 (只適用於執行緒)，設定後不再處理剩餘的檔案
+        
+    Returns:
+        List: 各檔案的處理結果或例外物件 (與 files 順序相同，停止時只包含已處理的檔案)
+    """
+    results = []
+    for file_path in files:
+        if stop_event is not None and stop_event.is_set():
+            break
+        try:
+            results.append(handler(file_path, output_dir))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _verify_agile_password(info: Dict[str, Any], password: str) -> bool:
+    """
+    以 agile 加密的密碼驗證值測試密碼 (只推導一次金鑰)
+    
+    Args:
+        info: OOXMLFile.info (agile 加密資訊)
+        password: 密碼
+        
+    Returns:
+        bool: 密碼是否正確
+    """
+    return ECMA376Agile.verify_password(
+        password,
+        info['passwordSalt'],
+        info['passwordHashAlgorithm'],
+        info['encryptedVerifierHashInput'],
+        info['encryptedVerifierHashValue'],
+        info['spinValue'],
+        info['passwordKeyBits'],
+    )
+
+
+def process_excel_file(file_path: Path, output_dir: Path, passwords: List[str]) -> Dict[str, Any]:
+    """
+    處理 Excel 檔案
+    
+    定義在模組層級且只依賴參數，可序列化後交給子行程執行
+    
+    Args:
+        file_path: 檔案路徑
+        output_dir: 輸出資料夾
+        passwords: 密碼清單
+        
+    Returns:
+        Dict: 處理結果
+    """
+    try:
+        # 嘗試開啟檔案
+        with open(file_path, 'rb') as f:
+            office_file = msoffcrypto.OfficeFile(f)
+            
+            # 檢查是否需要密碼
+            if not office_file.is_encrypted():
+                # 不需要密碼，直接複製內容 (不複製中繼資料；Linux 上 copyfile 以 sendfile 在核心內複製)
+                output_path = output_dir / f"unlocked_{file_path.name}"
+                shutil.copyfile(file_path, output_path)
+                
+                return {
+                    'file': str(file_path),
+                    'status': 'success',
+                    'message': '檔案未加密，已直接複製',
+                    'output_path': str(output_path)
+                }
+            
+            # 需要密碼: 先以密碼驗證值找出正確密碼，只有正確密碼才執行完整解密
+            is_agile = isinstance(office_file, OOXMLFile) and office_file.type == 'agile'
+            for password in passwords:
+                try:
+                    if is_agile:
+                        # agile 加密的金鑰推導需重複雜湊十萬次: 每個候選密碼只推導一次驗證值，
+                        # 通過後才載入金鑰 (load_key 的 verify_password 會再推導一次)
+                        if not _verify_agile_password(office_file.info, password):
+                            continue
+                        office_file.load_key(password=password)
+                    elif isinstance(office_file, OOXMLFile):
+                        # standard 加密的驗證只需一次 AES 解密，成本很低
+                        office_file.load_key(password=password, verify_password=True)
+                    else:
+                        # 舊版 .xls 的 load_key 本身即會驗證密碼
+                        office_file.load_key(password=password)
+                    break
+                except Exception:
+                    continue
+            else:
+                # 所有密碼都失敗
+                return {
+                    'file': str(file_path),
+                    'status': 'failed',
+                    'message': '所有密碼都無法解密此檔案',
+                    'output_path': None
+                }
+            
+            # 直接解密到輸出資料夾 (避免暫存檔跨裝置搬移造成的額外複製)
+            output_path = output_dir / f"unlocked_{file_path.name}"
+            try:
+                with open(output_path, 'wb') as out:
+                    office_file.decrypt(out)
+            except Exception:
+                output_path.unlink(missing_ok=True)
+                raise
+            
+            return {
+                'file': str(file_path),
+                'status': 'success',
+                'message': f'使用密碼解密成功',
+                'output_path': str(output_path)
+            }
+            
+    except Exception as e:
+        return {
+            'file': str(file_path),
+            'status': 'failed',
+            'message': f'處理 Excel 檔案時發生錯誤: {str(e)}',
+            'output_path': None
+        }
+
+
 class FileProcessor:
     """檔案處理器"""
     
-    def __init__(self, config: Dict[str, Any], logger: logging.Logger):
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger,
+                 stop_event: Optional[threading.Event] = None):
         """
         初始化檔案處理器
         
         Args:
             config: 設定檔字典
             logger: 日誌器
+            stop_event: 停止事件，設定後會在下一個檔案開始前中止處理
         """
         self.config = config
         self.logger = logger
-        self.passwords = config.get('passwords', [])
+        self.stop_event = stop_event or threading.Event()
+        self.passwords = _normalize_passwords(config.get('passwords'))
+        # ZIP 密碼需為 bytes，預先編碼一次，不在每個檔案的重試迴圈中重複編碼
+        self._passwords_bytes = [password.encode('utf-8') for password in self.passwords]
         self.file_settings = config.get('file_settings', {})
+        self.recursive = bool(self.file_settings.get('recursive', True))
+        
+        # 預先整理設定值，處理每個檔案時不需重複查詢設定字典
+        supported_extensions = self.file_settings.get('supported_extensions') or {}
+        self._excel_exts = frozenset(ext.lower() for ext in supported_extensions.get('excel') or [])
+        self._zip_exts = frozenset(ext.lower() for ext in supported_extensions.get('zip') or [])
+        self._rar_exts = frozenset(ext.lower() for ext in supported_extensions.get('rar') or [])
+        self._archive_exts = self._zip_exts | self._rar_exts
+        self._all_exts = frozenset(
+            ext.lower() for exts in supported_extensions.values() for ext in exts or []
+        )
+        self._max_size_bytes = self.file_settings.get('max_file_size', 500) * 1024 * 1024
+        
         self.external_tools = config.get('external_tools', {})
         
+        # 並行處理的工作數量 (預設為 CPU 核心數 - 1)
+        advanced = config.get('advanced', {})
+        default_workers = max(1, (os.cpu_count() or 2) - 1)
+        self.max_workers = max(1, int(advanced.get('max_workers') or default_workers))
+        
+        # 小於此大小 (MB) 的 AES 加密 ZIP 檔案會讀入記憶體並行測試密碼
+        self.in_memory_size = self.file_settings.get('in_memory_size', 64) * 1024 * 1024
+        
+        # 並行模式: thread (預設) 或 process (自動檢測與 Excel 模式改用多行程)
+        self.concurrency_mode = str(advanced.get('concurrency_mode', 'thread')).lower()
+        
+        # 副檔名 -> 處理函式
+        self._handler_by_ext = self._build_handler_index()
+        
         # 設定 RAR 工具路徑
         if self.external_tools.get('unrar_path'):
             rarfile.UNRAR_TOOL = self.external_tools['unrar_path']
     
-    def process_files(self, input_dir: str, output_dir: str) -> Dict[str, Any]:
+    def __getstate__(self) -> Dict[str, Any]:
+        """序列化時略過 threading.Event 與綁定方法，讓處理器可傳給子行程"""
+        state = self.__dict__.copy()
+        state.pop('stop_event', None)
+        state.pop('_handler_by_ext', None)
+        return state
+    
+    def __setstate__(self, state: Dict[str, Any]):
+        """在子行程中還原處理器"""
+        self.__dict__.update(state)
+        # 子行程不會收到停止事件，停止由主行程取消尚未開始的工作處理
+        self.stop_event = threading.Event()
+        self._handler_by_ext = self._build_handler_index()
+        
+        # 子行程 (spawn) 不會繼承主行程設定的模組層級變數
+        if self.external_tools.get('unrar_path'):
+            rarfile.UNRAR_TOOL = self.external_tools['unrar_path']
+    
+    def stop(self):
+        """要求停止處理，目前的檔案處理完成後生效"""
+        self.stop_event.set()
+    
+    def process_files(self, input_dir: str, output_dir: str,
+                      files: Optional[Iterable[Union[Path, os.DirEntry]]] = None) -> Dict[str, Any]:
         """
         批次處理檔案
         
         Args:
             input_dir: 輸入資料夾路徑
             output_dir: 輸出資料夾路徑
+            files: 已掃描的候選檔案，提供時不再重新掃描輸入資料夾
             
         Returns:
             Dict: 處理結果統計
@@ -59,7 +334,7 @@ class FileProcessor:
         output_path.mkdir(exist_ok=True)
         
         # 掃描檔案
-        files_to_process = self._scan_files(input_path)
+        files_to_process = self._scan_files(input_path, files)
         
         if not files_to_process:
             self.logger.warning("未找到需要處理的檔案")
@@ -68,7 +343,8 @@ class FileProcessor:
                 'success': 0,
                 'failed': 0,
                 'skipped': 0,
-                'details': []
+                'details': [],
+                'failed_details': []
             }
         
         self.logger.info(f"找到 {len(files_to_process)} 個檔案需要處理")
@@ -79,41 +355,25 @@ class FileProcessor:
             'success': 0,
             'failed': 0,
             'skipped': 0,
-            'details': []
+            'details': [],
+            'failed_details': []
         }
         
-        for file_path in tqdm(files_to_process, desc="處理檔案"):
-            try:
-                result = self._process_single_file(file_path, output_path)
-                results['details'].append(result)
-                
-                if result['status'] == 'success':
-                    results['success'] += 1
-                elif result['status'] == 'failed':
-                    results['failed'] += 1
-                else:
-                    results['skipped'] += 1
-                    
-            except Exception as e:
-                error_result = {
-                    'file': str(file_path),
-                    'status': 'failed',
-                    'message': f"處理時發生未預期錯誤: {str(e)}",
-                    'output_path': None
-                }
-                results['details'].append(error_result)
-                results['failed'] += 1
-                self.logger.error(f"處理檔案 {file_path} 時發生錯誤: {e}")
+        # process 模式下以子行程並行 (處理器本身可序列化，各行程各自解密)
+        self._run_batch(files_to_process, output_path, self._process_single_file, "處理檔案", results,
+                        use_processes=self.concurrency_mode == 'process')
         
         return results
     
-    def process_archive_files(self, input_dir: str, output_dir: str) -> Dict[str, Any]:
+    def process_archive_files(self, input_dir: str, output_dir: str,
+                              files: Optional[Iterable[Union[Path, os.DirEntry]]] = None) -> Dict[str, Any]:
         """
         只處理壓縮檔案 (ZIP/RAR)
         
         Args:
             input_dir: 輸入資料夾路徑
             output_dir: 輸出資料夾路徑
+            files: 已掃描的候選檔案，提供時不再重新掃描輸入資料夾
             
         Returns:
             Dict: 處理結果統計
@@ -123,11 +383,10 @@ class FileProcessor:
         output_path.mkdir(exist_ok=True)
         
         # 只掃描壓縮檔案
-        archive_extensions = self.file_settings.get('supported_extensions', {}).get('archives', [])
-        files = []
-        for ext in archive_extensions:
-            files.extend(input_path.glob(f"*{ext}"))
-            files.extend(input_path.glob(f"**/*{ext}"))
+        if files is None:
+            files = iter_matching_files(input_path, self._archive_exts, self.recursive)
+        # 逐一走訪候選檔案，同時去除重複並過濾檔案大小
+        files = self._scan_files(input_path, files)
         
         self.logger.info(f"找到 {len(files)} 個壓縮檔案")
         
@@ -136,7 +395,8 @@ class FileProcessor:
             'success': 0,
             'failed': 0,
             'skipped': 0,
-            'details': []
+            'details': [],
+            'failed_details': []
         }
         
         if not files:
@@ -144,39 +404,19 @@ class FileProcessor:
             return results
         
         # 處理檔案
-        for file_path in tqdm(files, desc="處理壓縮檔案"):
-            try:
-                result = self._process_archive_file(file_path, output_path)
-                results['details'].append(result)
-                
-                if result['status'] == 'success':
-                    results['success'] += 1
-                elif result['status'] == 'skipped':
-                    results['skipped'] += 1
-                else:
-                    results['failed'] += 1
-                    
-            except Exception as e:
-                error_result = {
-                    'file_path': str(file_path),
-                    'file_type': 'archive',
-                    'status': 'failed',
-                    'message': f"處理時發生未預期錯誤: {str(e)}",
-                    'output_path': None
-                }
-                results['details'].append(error_result)
-                results['failed'] += 1
-                self.logger.error(f"處理檔案 {file_path} 時發生錯誤: {e}")
+        self._run_batch(files, output_path, self._process_archive_file, "處理壓縮檔案", results, file_type='archive')
         
         return results
     
-    def process_excel_files(self, input_dir: str, output_dir: str) -> Dict[str, Any]:
+    def process_excel_files(self, input_dir: str, output_dir: str,
+                            files: Optional[Iterable[Union[Path, os.DirEntry]]] = None) -> Dict[str, Any]:
         """
         只處理 Excel 檔案
         
         Args:
             input_dir: 輸入資料夾路徑
             output_dir: 輸出資料夾路徑
+            files: 已掃描的候選檔案，提供時不再重新掃描輸入資料夾
             
         Returns:
             Dict: 處理結果統計
@@ -186,11 +426,10 @@ class FileProcessor:
         output_path.mkdir(exist_ok=True)
         
         # 只掃描 Excel 檔案
-        excel_extensions = self.file_settings.get('supported_extensions', {}).get('excel', [])
-        files = []
-        for ext in excel_extensions:
-            files.extend(input_path.glob(f"*{ext}"))
-            files.extend(input_path.glob(f"**/*{ext}"))
+        if files is None:
+            files = iter_matching_files(input_path, self._excel_exts, self.recursive)
+        # 逐一走訪候選檔案，同時去除重複並過濾檔案大小
+        files = self._scan_files(input_path, files)
         
         self.logger.info(f"找到 {len(files)} 個 Excel 檔案")
         
@@ -199,7 +438,8 @@ class FileProcessor:
             'success': 0,
             'failed': 0,
             'skipped': 0,
-            'details': []
+            'details': [],
+            'failed_details': []
         }
         
         if not files:
@@ -207,52 +447,124 @@ class FileProcessor:
             return results
         
         # 處理檔案
-        for file_path in tqdm(files, desc="處理 Excel 檔案"):
-            try:
-                result = self._process_excel_file(file_path, output_path)
-                results['details'].append(result)
-                
-                if result['status'] == 'success':
-                    results['success'] += 1
-                elif result['status'] == 'skipped':
-                    results['skipped'] += 1
-                else:
-                    results['failed'] += 1
-                    
-            except Exception as e:
-                error_result = {
-                    'file_path': str(file_path),
-                    'file_type': 'excel',
-                    'status': 'failed',
-                    'message': f"處理時發生未預期錯誤: {str(e)}",
-                    'output_path': None
-                }
-                results['details'].append(error_result)
-                results['failed'] += 1
-                self.logger.error(f"處理檔案 {file_path} 時發生錯誤: {e}")
+        # Excel 解密屬於 CPU 密集工作，process 模式下改用子行程並行
+        if self.concurrency_mode == 'process':
+            handler = partial(process_excel_file, passwords=self.passwords)
+            self._run_batch(files, output_path, handler, "處理 Excel 檔案", results,
+                            file_type='excel', use_processes=True)
+        else:
+            self._run_batch(files, output_path, self._process_excel_file, "處理 Excel 檔案", results, file_type='excel')
         
         return results
     
-    def _scan_files(self, input_path: Path) -> List[Path]:
-        """掃描需要處理的檔案"""
-        supported_extensions = self.file_settings.get('supported_extensions', {})
-        all_extensions = []
+    def _run_batch(self, files: List[Path], output_dir: Path,
+                   handler: Callable[[Path, Path], Dict[str, Any]], desc: str,
+                   results: Dict[str, Any], file_type: Optional[str] = None,
+                   use_processes: bool = False):
+        """
+        並行處理檔案，並將結果彙整到 results
         
-        for ext_list in supported_extensions.values():
-            all_extensions.extend(ext_list)
+        Args:
+            files: 檔案清單
+            output_dir: 輸出資料夾
+            handler: 單一檔案的處理函式 (使用子行程時必須可序列化)
+            desc: 進度列說明
+            results: 處理結果統計 (就地更新)
+            file_type: 檔案類型，記錄於錯誤結果中
+            use_processes: 是否使用子行程取代執行緒
+        """
+        if use_processes:
+            # spawn 在 Windows 與 PyInstaller 打包後的執行檔中行為一致
+            executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                           mp_context=multiprocessing.get_context('spawn'))
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
         
-        files = []
-        for ext in all_extensions:
-            files.extend(input_path.glob(f"*{ext}"))
-            files.extend(input_path.glob(f"**/*{ext}"))
+        # 輸出名稱相同的檔案分在同一組，由同一個工作依序處理
+        groups = self._group_by_output(files)
+        # threading.Event 無法傳給子行程，子行程的停止由取消尚未開始的工作處理
+        stop_event = None if use_processes else self.stop_event
         
-        # 過濾檔案大小
-        max_size = self.file_settings.get('max_file_size', 500) * 1024 * 1024  # 轉換為位元組
+        stopped = 0
+        try:
+            futures = [executor.submit(_process_in_order, handler, group, output_dir, stop_event)
+                       for group in groups]
+            
+            # 結果依原始順序在呼叫端執行緒彙整，不需要鎖
+            # 進度列約每 0.5% 且至少間隔 0.2 秒才更新，避免大量小檔案時頻繁重繪
+            with tqdm(total=len(files), desc=desc, miniters=max(1, len(files) // 200),
+                      mininterval=0.2, smoothing=0) as progress:
+                for group, future in zip(groups, futures):
+                    # 已要求停止時取消尚未開始的檔案
+                    if self.stop_event.is_set():
+                        future.cancel()
+                    if future.cancelled():
+                        stopped += len(group)
+                        progress.update(len(group))
+                        continue
+                    
+                    try:
+                        group_results = future.result()
+                    except Exception as e:
+                        group_results = [e] * len(group)
+                    # 停止後同組剩餘的檔案未處理
+                    stopped += len(group) - len(group_results)
+                    
+                    for file_path, result in zip(group, group_results):
+                        if isinstance(result, Exception):
+                            self.logger.error(f"處理檔案 {file_path} 時發生錯誤: {result}")
+                            result = {
+                                'file': str(file_path),
+                                'status': 'failed',
+                                'message': f"處理時發生未預期錯誤: {str(result)}",
+                                'output_path': None
+                            }
+                            if file_type:
+                                result['file_type'] = file_type
+                        
+                        results['details'].append(result)
+                        if result['status'] == 'success':
+                            results['success'] += 1
+                        elif result['status'] == 'failed':
+                            results['failed'] += 1
+                            results['failed_details'].append(result)
+                        else:
+                            results['skipped'] += 1
+                    progress.update(len(group))
+        except BaseException:
+            # 中斷 (例如 Ctrl+C) 時取消尚未開始的檔案並立即返回，不等待佇列中的檔案全部處理完
+            self.stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        else:
+            executor.shutdown()
+        
+        if stopped:
+            results['skipped'] += stopped
+            self.logger.warning(f"處理已中止，剩餘 {stopped} 個檔案未處理")
+    
+    def _scan_files(self, input_path: Path,
+                    candidates: Optional[Iterable[Union[Path, os.DirEntry]]] = None) -> List[Path]:
+        """掃描需要處理的檔案 (提供 candidates 時只做大小過濾)"""
+        if candidates is None:
+            candidates = iter_matching_files(input_path, self._all_exts, self.recursive)
+        
+        # 過濾檔案大小 (DirEntry.stat 會沿用走訪時的快取，不需再次呼叫 stat)
+        max_size = self._max_size_bytes
         filtered_files = []
+        seen = set()
         
-        for file_path in files:
+        for candidate in candidates:
+            # 以正規化的路徑字串去除重複，避免並行處理時同一檔案被同時寫入
+            # (先比對字串，重複的項目不需建立 Path 物件)
+            key = os.path.normpath(os.fspath(candidate))
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            file_path = Path(candidate)
             try:
-                if file_path.stat().st_size <= max_size:
+                if candidate.stat().st_size <= max_size:
                     filtered_files.append(file_path)
                 else:
                     self.logger.warning(f"檔案 {file_path} 超過大小限制，已跳過")
@@ -261,6 +573,65 @@ class FileProcessor:
         
         return filtered_files
     
+    def _output_name(self, file_path: Path) -> Optional[str]:
+        """
+        取得檔案的輸出名稱 (Excel 為輸出檔名，壓縮檔為解壓資料夾名稱)
+        
+        Returns:
+            Optional[str]: 輸出名稱 (小寫，以便在不分大小寫的檔案系統上比對)，不支援的類型回傳 None
+        """
+        file_ext = file_path.suffix.lower()
+        if file_ext in self._excel_exts:
+            return f"unlocked_{file_path.name}".lower()
+        if file_ext in self._archive_exts:
+            return f"unlocked_{file_path.stem}".lower()
+        return None
+    
+    def _group_by_output(self, files: List[Path]) -> List[List[Path]]:
+        """
+        依輸出名稱將檔案分組，並記錄輸出名稱衝突的檔案
+        
+        例如 input/a.xlsx 與 input/sub/a.xlsx 都會寫入 unlocked_a.xlsx，
+        x.zip 與 x.rar 都會解壓到 unlocked_x；同組檔案需依序處理 (後處理者覆寫先處理者)
+        
+        Args:
+            files: 檔案清單
+            
+        Returns:
+            List[List[Path]]: 分組後的檔案 (組與組內皆保留原順序)
+        """
+        groups: Dict[Any, List[Path]] = {}
+        for file_path in files:
+            name = self._output_name(file_path)
+            # 沒有輸出的檔案各自成組
+            groups.setdefault(name if name is not None else file_path, []).append(file_path)
+        
+        for name, group in groups.items():
+            if len(group) > 1:
+                self.logger.warning(
+                    "%d 個檔案的輸出名稱相同 (%s)，將依序處理，後處理的檔案會覆寫先前的輸出: %s",
+                    len(group), name, ", ".join(str(file_path) for file_path in group)
+                )
+        
+        return list(groups.values())
+    
+    def _build_handler_index(self) -> Dict[str, Callable[[Path, Path], Dict[str, Any]]]:
+        """
+        建立副檔名 (小寫) 對應處理函式的索引
+        
+        副檔名重複設定時依 excel、zip、rar 的順序優先
+        """
+        handlers = [
+            (self._rar_exts, self._process_rar_file),
+            (self._zip_exts, self._process_zip_file),
+            (self._excel_exts, self._process_excel_file),
+        ]
+        
+        handler_by_ext = {}
+        for exts, handler in handlers:
+            handler_by_ext.update(dict.fromkeys(exts, handler))
+        return handler_by_ext
+    
     def _process_single_file(self, file_path: Path, output_dir: Path) -> Dict[str, Any]:
         """
         處理單一檔案
@@ -273,15 +644,11 @@ class FileProcessor:
             Dict: 處理結果
         """
         file_ext = file_path.suffix.lower()
-        supported_extensions = self.file_settings.get('supported_extensions', {})
         
         # 判斷檔案類型
-        if file_ext in supported_extensions.get('excel', []):
-            return self._process_excel_file(file_path, output_dir)
-        elif file_ext in supported_extensions.get('zip', []):
-            return self._process_zip_file(file_path, output_dir)
-        elif file_ext in supported_extensions.get('rar', []):
-            return self._process_rar_file(file_path, output_dir)
+        handler = self._handler_by_ext.get(file_ext)
+        if handler is not None:
+            return handler(file_path, output_dir)
         else:
             return {
                 'file': str(file_path),
@@ -292,73 +659,24 @@ class FileProcessor:
     
     def _process_excel_file(self, file_path: Path, output_dir: Path) -> Dict[str, Any]:
         """處理 Excel 檔案"""
-        try:
-            # 嘗試開啟檔案
-            with open(file_path, 'rb') as f:
-                office_file = msoffcrypto.OfficeFile(f)
-                
-                # 檢查是否需要密碼
-                if not office_file.is_encrypted():
-                    # 不需要密碼，直接複製
-                    output_path = output_dir / f"unlocked_{file_path.name}"
-                    shutil.copy2(file_path, output_path)
-                    
-                    return {
-                        'file': str(file_path),
-                        'status': 'success',
-                        'message': '檔案未加密，已直接複製',
-                        'output_path': str(output_path)
-                    }
-                
-                # 需要密碼，嘗試解密
-                for password in self.passwords:
-                    try:
-                        office_file.load_key(password=password)
-                        
-                        # 解密到臨時檔案
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=file_path.suffix) as temp_file:
-                            office_file.decrypt(temp_file)
-                            temp_path = Path(temp_file.name)
-                        
-                        # 移動到輸出資料夾
-                        output_path = output_dir / f"unlocked_{file_path.name}"
-                        shutil.move(str(temp_path), str(output_path))
-                        
-                        return {
-                            'file': str(file_path),
-                            'status': 'success',
-                            'message': f'使用密碼解密成功',
-                            'output_path': str(output_path)
-                        }
-                        
-                    except Exception:
-                        continue
-                
-                # 所有密碼都失敗
-                return {
-                    'file': str(file_path),
-                    'status': 'failed',
-                    'message': '所有密碼都無法解密此檔案',
-                    'output_path': None
-                }
-                
-        except Exception as e:
-            return {
-                'file': str(file_path),
-                'status': 'failed',
-                'message': f'處理 Excel 檔案時發生錯誤: {str(e)}',
-                'output_path': None
-            }
+        return process_excel_file(file_path, output_dir, self.passwords)
+    
+    def _process_archive_file(self, file_path: Path, output_dir: Path) -> Dict[str, Any]:
+        """依副檔名處理 ZIP 或 RAR 檔案"""
+        if file_path.suffix.lower() in self._rar_exts:
+            return self._process_rar_file(file_path, output_dir)
+        return self._process_zip_file(file_path, output_dir)
     
     def _process_zip_file(self, file_path: Path, output_dir: Path) -> Dict[str, Any]:
         """處理 ZIP 檔案"""
+        output_subdir = output_dir / f"unlocked_{file_path.stem}"
         try:
             # 嘗試開啟 ZIP 檔案
             with pyzipper.AESZipFile(file_path, 'r') as zip_file:
-                # 檢查是否需要密碼
-                if not zip_file.needs_password():
+                # 檢查是否需要密碼 (一般位元旗標第 0 位表示該項目已加密)
+                encrypted_entries = [info for info in zip_file.infolist() if info.flag_bits & 0x1]
+                if not encrypted_entries:
                     # 不需要密碼，直接解壓
-                    output_subdir = output_dir / f"unlocked_{file_path.stem}"
                     output_subdir.mkdir(exist_ok=True)
                     zip_file.extractall(output_subdir)
                     
@@ -369,35 +687,43 @@ class FileProcessor:
                         'output_path': str(output_subdir)
                     }
                 
-                # 需要密碼，嘗試解密
-                for password in self.passwords:
-                    try:
-                        zip_file.setpassword(password.encode('utf-8'))
-                        
-                        # 測試密碼是否正確
-                        zip_file.testzip()
-                        
-                        # 解壓到輸出資料夾
-                        output_subdir = output_dir / f"unlocked_{file_path.stem}"
-                        output_subdir.mkdir(exist_ok=True)
-                        zip_file.extractall(output_subdir)
-                        
-                        return {
-                            'file': str(file_path),
-                            'status': 'success',
-                            'message': f'使用密碼解壓成功',
-                            'output_path': str(output_subdir)
-                        }
-                        
-                    except Exception:
-                        continue
+                # 以最小的加密項目測試密碼，避免每次嘗試都解壓整個壓縮檔
+                probe_entry = min(encrypted_entries, key=lambda info: info.file_size)
+                
+                # 小型 AES 壓縮檔讀入記憶體並行測試所有密碼，只留下找到的密碼
+                # - ZipCrypto 以純 Python 解密且持有 GIL，多執行緒無法加速
+                # - 多個檔案已並行處理時不再開啟密碼執行緒，避免執行緒數量相乘
+                passwords = self._passwords_bytes
+                if (len(passwords) > 1 and self.max_workers == 1
+                        and probe_entry.wz_aes_version is not None
+                        and os.path.getsize(file_path) <= self.in_memory_size):
+                    probe_index = zip_file.infolist().index(probe_entry)
+                    password = self._find_zip_password_in_memory(file_path.read_bytes(), probe_index)
+                    passwords = [password] if password is not None else []
+                
+                # 需要密碼: 先找出正確密碼，只有正確密碼才建立資料夾並解壓
+                for password in passwords:
+                    if _probe_zip_password(zip_file, probe_entry, password):
+                        break
+                else:
+                    # 所有密碼都失敗
+                    return {
+                        'file': str(file_path),
+                        'status': 'failed',
+                        'message': '所有密碼都無法解壓此 ZIP 檔案',
+                        'output_path': None
+                    }
+                
+                # 解壓到輸出資料夾
+                zip_file.setpassword(password)
+                output_subdir.mkdir(exist_ok=True)
+                zip_file.extractall(output_subdir)
                 
-                # 所有密碼都失敗
                 return {
                     'file': str(file_path),
-                    'status': 'failed',
-                    'message': '所有密碼都無法解壓此 ZIP 檔案',
-                    'output_path': None
+                    'status': 'success',
+                    'message': f'使用密碼解壓成功',
+                    'output_path': str(output_subdir)
                 }
                 
         except Exception as e:
@@ -408,15 +734,43 @@ class FileProcessor:
                 'output_path': None
             }
     
+    def _find_zip_password_in_memory(self, data: bytes, probe_index: int) -> Optional[bytes]:
+        """
+        在記憶體中並行測試 ZIP 密碼
+        
+        每個執行緒各自開啟 ZIP，互不共用檔案位置；任一密碼成功即取消其餘嘗試
+        
+        Args:
+            data: ZIP 檔案內容
+            probe_index: 用來測試的加密項目在 infolist() 中的位置
+            
+        Returns:
+            Optional[bytes]: 正確的密碼 (UTF-8 編碼)，全部失敗時回傳 None
+        """
+        def try_password(password: bytes) -> bool:
+            with pyzipper.AESZipFile(io.BytesIO(data), 'r') as zip_file:
+                return _probe_zip_password(zip_file, zip_file.infolist()[probe_index], password)
+        
+        workers = min(len(self._passwords_bytes), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(try_password, password): password for password in self._passwords_bytes}
+            for future in as_completed(futures):
+                if future.result():
+                    for pending in futures:
+                        pending.cancel()
+                    return futures[future]
+        
+        return None
+    
     def _process_rar_file(self, file_path: Path, output_dir: Path) -> Dict[str, Any]:
         """處理 RAR 檔案"""
+        output_subdir = output_dir / f"unlocked_{file_path.stem}"
         try:
             # 嘗試開啟 RAR 檔案
             with rarfile.RarFile(file_path) as rar_file:
                 # 檢查是否需要密碼
                 if not rar_file.needs_password():
                     # 不需要密碼，直接解壓
-                    output_subdir = output_dir / f"unlocked_{file_path.stem}"
                     output_subdir.mkdir(exist_ok=True)
                     rar_file.extractall(output_subdir)
                     
@@ -427,33 +781,37 @@ class FileProcessor:
                         'output_path': str(output_subdir)
                     }
                 
-                # 需要密碼，嘗試解密
+                # 需要密碼: 先找出正確密碼，只有正確密碼才建立資料夾並解壓
                 for password in self.passwords:
                     try:
-                        # 測試密碼是否正確
                         rar_file.setpassword(password)
                         
-                        # 解壓到輸出資料夾
-                        output_subdir = output_dir / f"unlocked_{file_path.stem}"
-                        output_subdir.mkdir(exist_ok=True)
-                        rar_file.extractall(output_subdir)
-                        
-                        return {
-                            'file': str(file_path),
-                            'status': 'success',
-                            'message': f'使用密碼解壓成功',
-                            'output_path': str(output_subdir)
-                        }
-                        
+                        # 測試密碼是否正確: 只讀取最小的檔案項目，而非直接解壓整個壓縮檔
+                        # (標頭加密的 RAR 需設定密碼後才能列出項目，密碼錯誤時即會失敗)
+                        entries = [info for info in rar_file.infolist() if not info.is_dir()]
+                        if entries:
+                            rar_file.read(min(entries, key=lambda info: info.file_size))
+                        break
                     except Exception:
                         continue
+                else:
+                    # 所有密碼都失敗
+                    return {
+                        'file': str(file_path),
+                        'status': 'failed',
+                        'message': '所有密碼都無法解壓此 RAR 檔案',
+                        'output_path': None
+                    }
+                
+                # 解壓到輸出資料夾
+                output_subdir.mkdir(exist_ok=True)
+                rar_file.extractall(output_subdir)
                 
-                # 所有密碼都失敗
                 return {
                     'file': str(file_path),
-                    'status': 'failed',
-                    'message': '所有密碼都無法解壓此 RAR 檔案',
-                    'output_path': None
+                    'status': 'success',
+                    'message': f'使用密碼解壓成功',
+                    'output_path': str(output_subdir)
                 }
                 
         except Exception as e:
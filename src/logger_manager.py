@@ -15,6 +15,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Any
 
+from .timestamp_utils import timestamp_to_int
+
 
 class LoggerManager:
     """日誌管理器"""
@@ -52,6 +54,9 @@ class LoggerManager:
         # 建立控制台處理器
         self._setup_console_handler()
         
+        # 快取日誌等級判斷結果
+        self.refresh_levels()
+        
         # 清理舊日誌
         if config.get('clean_on_start', True):
             self.cleanup_old_logs()
@@ -70,7 +75,7 @@ class LoggerManager:
         self.logger.addHandler(file_handler)
         
         # 記錄日誌檔案路徑
-        self.logger.info(f"日誌檔案已建立: {log_file}")
+        self.logger.info("日誌檔案已建立: %s", log_file)
     
     def _setup_console_handler(self):
         """設定控制台處理器"""
@@ -80,6 +85,19 @@ class LoggerManager:
         
         self.logger.addHandler(console_handler)
     
+    def refresh_levels(self):
+        """重新快取日誌等級判斷結果 (變更日誌等級或處理器後需呼叫)"""
+        self._debug_on = self.logger.isEnabledFor(logging.DEBUG)
+        self._info_on = self.logger.isEnabledFor(logging.INFO)
+        
+        # 狀態 -> (訊息格式, 日誌方法)，等級未啟用時日誌方法為 None
+        self._status_dispatch = {
+            'success': ("✓ %s - %s", self.logger.info if self._info_on else None),
+            'failed': ("✗ %s - %s", self.logger.error),
+            'skipped': ("- %s - %s", self.logger.warning),
+        }
+        self._status_default = ("? %s - %s", self.logger.debug if self._debug_on else None)
+    
     def cleanup_old_logs(self):
         """清理舊日誌檔案"""
         try:
@@ -88,41 +106,49 @@ class LoggerManager:
             keep_files = log_policy.get('keep_files', 20)
             
             # 按時間清理
-            cutoff_date = datetime.now() - timedelta(days=keep_days)
-            log_files = list(self.log_dir.glob("unlocker_*.log"))
+            cutoff_ts = int((datetime.now() - timedelta(days=keep_days)).strftime("%Y%m%d%H%M%S"))
+            
+            # 單次走訪日誌資料夾，DirEntry 會快取 stat 結果
+            log_files = []
+            with os.scandir(self.log_dir) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.startswith('unlocker_') and name.endswith('.log'):
+                        log_files.append((name, entry.stat(follow_symlinks=False).st_mtime, entry.path))
             
             # 過濾掉過舊的檔案
             files_to_delete = []
-            for log_file in log_files:
+            remaining_files = []
+            for name, mtime, path in log_files:
                 try:
                     # 從檔案名稱提取時間戳
-                    timestamp_str = log_file.stem.split('_', 1)[1]
-                    file_date = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                    
-                    if file_date < cutoff_date:
-                        files_to_delete.append(log_file)
-                except (ValueError, IndexError):
+                    file_ts = timestamp_to_int(name[len('unlocker_'):-len('.log')])
+                except ValueError:
                     # 如果無法解析時間戳，保留檔案
+                    remaining_files.append((mtime, path))
                     continue
+                
+                if file_ts < cutoff_ts:
+                    files_to_delete.append(path)
+                else:
+                    remaining_files.append((mtime, path))
             
             # 按檔案數量清理
-            remaining_files = [f for f in log_files if f not in files_to_delete]
-            remaining_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-            
             if len(remaining_files) > keep_files:
-                files_to_delete.extend(remaining_files[keep_files:])
+                remaining_files.sort(reverse=True)
+                files_to_delete.extend(path for _, path in remaining_files[keep_files:])
             
             # 刪除檔案
             deleted_count = 0
             for log_file in files_to_delete:
                 try:
-                    log_file.unlink()
+                    os.unlink(log_file)
                     deleted_count += 1
                 except OSError as e:
                     self.logger.warning(f"無法刪除日誌檔案 {log_file}: {e}")
             
             if deleted_count > 0:
-                self.logger.info(f"已清理 {deleted_count} 個舊日誌檔案")
+                self.logger.info("已清理 %d 個舊日誌檔案", deleted_count)
                 
         except Exception as e:
             self.logger.error(f"清理日誌檔案時發生錯誤: {e}")
@@ -146,29 +172,27 @@ class LoggerManager:
     
     def log_processing_start(self, file_count: int):
         """記錄處理開始"""
-        self.logger.info(f"開始批次處理，共 {file_count} 個檔案")
+        self.logger.info("開始批次處理，共 %d 個檔案", file_count)
     
     def log_processing_end(self, success_count: int, failed_count: int, total_time: float):
-        """記錄處理結束"""
-        self.logger.info(f"批次處理完成 - 成功: {success_count}, 失敗: {failed_count}, 耗時: {total_time:.2f}秒")
+        """記錄處理結束 (數值另以 extra 欄位附在紀錄上，供結構化日誌處理器直接取用)"""
+        self.logger.info("批次處理完成 - 成功: %d, 失敗: %d, 耗時: %.2f秒",
+                         success_count, failed_count, total_time,
+                         extra={'success': success_count, 'failed': failed_count, 'duration': total_time})
     
     def log_file_processing(self, file_path: str, status: str, message: str = ""):
         """記錄單一檔案處理結果"""
-        if status == "success":
-            self.logger.info(f"✓ {file_path} - {message}")
-        elif status == "failed":
-            self.logger.error(f"✗ {file_path} - {message}")
-        elif status == "skipped":
-            self.logger.warning(f"- {file_path} - {message}")
-        else:
-            self.logger.debug(f"? {file_path} - {message}")
+        # 使用 % 格式延後組字串，日誌等級未啟用時不需格式化
+        fmt, log_fn = self._status_dispatch.get(status, self._status_default)
+        if log_fn is not None:
+            log_fn(fmt, file_path, message)
     
     def cleanup_on_exit(self):
         """程式結束時清理"""
         if self.config.get('log_policy', {}).get('clean_on_exit', False):
             self.cleanup_old_logs()
         
-        # 關閉所有處理器
-        for handler in self.logger.handlers[:]:
+        # 關閉所有處理器後一次清空，不需複製清單或逐一移除
+        for handler in self.logger.handlers:
             handler.close()
-            self.logger.removeHandler(handler)
+        self.logger.handlers.clear()
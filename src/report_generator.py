@@ -11,11 +11,28 @@ Authors: AI Assistant
 import os
 import json
 import csv
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Any, List
 import logging
 
+from .timestamp_utils import timestamp_to_int
+
+
+# 錯誤訊息關鍵字 -> 錯誤類型 (依序比對，皆不符合時為「其他錯誤」)
+ERROR_TYPE_KEYWORDS = (
+    ('密碼', '密碼錯誤'),
+    ('檔案', '檔案錯誤'),
+    ('權限', '權限錯誤'),
+)
+
+# 時間長度單位 (上限秒數, 除數, 單位)，依序取第一個小於上限的單位
+DURATION_UNITS = (
+    (60, 1, '秒'),
+    (3600, 60, '分鐘'),
+    (float('inf'), 3600, '小時'),
+)
+
 
 class ReportGenerator:
     """報表生成器"""
@@ -34,6 +51,15 @@ class ReportGenerator:
         self.report_dir.mkdir(exist_ok=True)
         
         self.report_settings = config.get('report_settings', {})
+        
+        # 依設定的格式預先決定報表生成函式 (預設為 yaml)
+        format_handlers = {
+            'json': self._generate_json_report,
+            'csv': self._generate_csv_report,
+            'yaml': self._generate_yaml_report,
+        }
+        format_type = str(self.report_settings.get('format', 'yaml')).lower()
+        self._format_fn = format_handlers.get(format_type, self._generate_yaml_report)
     
     def generate_report(self, results: Dict[str, Any], start_time: datetime, end_time: datetime) -> str:
         """
@@ -50,20 +76,32 @@ class ReportGenerator:
         # 準備報表資料
         report_data = self._prepare_report_data(results, start_time, end_time)
         
+        # 報表檔名時間戳以結束時間計算一次，各格式共用
+        timestamp = end_time.strftime("%Y%m%d_%H%M%S")
+        
         # 根據設定選擇格式
-        format_type = self.report_settings.get('format', 'yaml').lower()
-        
-        if format_type == 'json':
-            return self._generate_json_report(report_data)
-        elif format_type == 'csv':
-            return self._generate_csv_report(report_data)
-        else:  # 預設為 yaml
-            return self._generate_yaml_report(report_data)
+        return self._format_fn(report_data, timestamp)
     
     def _prepare_report_data(self, results: Dict[str, Any], start_time: datetime, end_time: datetime) -> Dict[str, Any]:
         """準備報表資料"""
         duration = (end_time - start_time).total_seconds()
         
+        # 只保留報表會用到的欄位，統計與序列化共用同一份精簡清單
+        details = [
+            {
+                'file': d.get('file', ''),
+                'status': d.get('status', 'unknown'),
+                'message': d.get('message', ''),
+                'output_path': d.get('output_path', '')
+            }
+            for d in results['details']
+        ]
+        
+        total = results['total']
+        success = results['success']
+        failed = results['failed']
+        skipped = results['skipped']
+        
         report_data = {
             'report_info': {
                 'generated_at': end_time.isoformat(),
@@ -73,73 +111,85 @@ class ReportGenerator:
                 'duration_formatted': self._format_duration(duration)
             },
             'summary': {
-                'total_files': results['total'],
-                'successful': results['success'],
-                'failed': results['failed'],
-                'skipped': results['skipped'],
-                'success_rate': (results['success'] / results['total'] * 100) if results['total'] > 0 else 0
+                'total_files': total,
+                'successful': success,
+                'failed': failed,
+                'skipped': skipped,
+                'success_rate': (success / total * 100) if total else 0.0
             },
-            'details': results['details']
+            'details': details
         }
         
         # 添加統計資訊
         if self.report_settings.get('include_statistics', True):
-            report_data['statistics'] = self._generate_statistics(results['details'])
+            report_data['statistics'] = self._generate_statistics(details)
         
         return report_data
     
-    def _generate_yaml_report(self, report_data: Dict[str, Any]) -> str:
-        """生成 YAML 格式報表"""
+    def _generate_yaml_report(self, report_data: Dict[str, Any], timestamp: str) -> str:
+        """生成 YAML 格式報表 (timestamp 為檔名使用的時間戳)"""
         try:
             import yaml
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # 優先使用 libyaml 的 C 輸出器
+            try:
+                from yaml import CSafeDumper as _Dumper
+            except ImportError:
+                from yaml import SafeDumper as _Dumper
+            
             report_file = self.report_dir / f"report_{timestamp}.yaml"
             
+            # 先序列化為字串再一次寫入，避免大量小型寫入，序列化失敗時也不會留下不完整的檔案
+            content = yaml.dump(report_data, Dumper=_Dumper, default_flow_style=False, allow_unicode=True, indent=2)
             with open(report_file, 'w', encoding='utf-8') as f:
-                yaml.dump(report_data, f, default_flow_style=False, allow_unicode=True, indent=2)
+                f.write(content)
             
             self.logger.info(f"YAML 報表已生成: {report_file}")
             return str(report_file)
             
         except ImportError:
             self.logger.error("PyYAML 套件未安裝，無法生成 YAML 報表")
-            return self._generate_json_report(report_data)
+            return self._generate_json_report(report_data, timestamp)
         except Exception as e:
             self.logger.error(f"生成 YAML 報表時發生錯誤: {e}")
-            return self._generate_json_report(report_data)
+            return self._generate_json_report(report_data, timestamp)
     
-    def _generate_json_report(self, report_data: Dict[str, Any]) -> str:
-        """生成 JSON 格式報表"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _generate_json_report(self, report_data: Dict[str, Any], timestamp: str) -> str:
+        """生成 JSON 格式報表 (timestamp 為檔名使用的時間戳)"""
         report_file = self.report_dir / f"report_{timestamp}.json"
         
+        # 先序列化為字串再一次寫入
+        content = json.dumps(report_data, ensure_ascii=False, indent=2)
         with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
+            f.write(content)
         
         self.logger.info(f"JSON 報表已生成: {report_file}")
         return str(report_file)
     
-    def _generate_csv_report(self, report_data: Dict[str, Any]) -> str:
-        """生成 CSV 格式報表"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _generate_csv_report(self, report_data: Dict[str, Any], timestamp: str) -> str:
+        """生成 CSV 格式報表 (timestamp 為檔名使用的時間戳)"""
         report_file = self.report_dir / f"report_{timestamp}.csv"
         
-        with open(report_file, 'w', newline='', encoding='utf-8') as f:
+        generated_at = report_data['report_info']['generated_at']
+        
+        # 使用較大的寫入緩衝區，減少大量資料列時的寫入次數
+        with open(report_file, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
             writer = csv.writer(f)
             
             # 寫入標題
             writer.writerow(['檔案路徑', '狀態', '訊息', '輸出路徑', '處理時間'])
             
             # 寫入詳細資料
-            for detail in report_data['details']:
-                writer.writerow([
+            writer.writerows(
+                (
                     detail.get('file', ''),
                     detail.get('status', ''),
                     detail.get('message', ''),
                     detail.get('output_path', ''),
-                    report_data['report_info']['generated_at']
-                ])
+                    generated_at
+                )
+                for detail in report_data['details']
+            )
         
         self.logger.info(f"CSV 報表已生成: {report_file}")
         return str(report_file)
@@ -152,65 +202,59 @@ class ReportGenerator:
             'by_error_type': {}
         }
         
-        # 按狀態統計
-        for detail in details:
-            status = detail.get('status', 'unknown')
-            stats['by_status'][status] = stats['by_status'].get(status, 0) + 1
+        by_status = stats['by_status']
+        by_file_type = stats['by_file_type']
+        by_error_type = stats['by_error_type']
         
-        # 按檔案類型統計
+        # 單次走訪同時統計狀態、檔案類型與錯誤類型
         for detail in details:
+            # 按狀態統計
+            status = detail.get('status', 'unknown')
+            by_status[status] = by_status.get(status, 0) + 1
+            
+            # 按檔案類型統計 (以字串取副檔名，不需為每筆資料建立 Path 物件)
             file_path = detail.get('file', '')
             if file_path:
-                file_ext = Path(file_path).suffix.lower()
-                stats['by_file_type'][file_ext] = stats['by_file_type'].get(file_ext, 0) + 1
-        
-        # 按錯誤類型統計
-        for detail in details:
-            if detail.get('status') == 'failed':
+                file_ext = os.path.splitext(file_path)[1].lower()
+                by_file_type[file_ext] = by_file_type.get(file_ext, 0) + 1
+            
+            # 按錯誤類型統計（簡化處理）
+            if status == 'failed':
                 message = detail.get('message', '')
-                # 提取錯誤類型（簡化處理）
-                if '密碼' in message:
-                    error_type = '密碼錯誤'
-                elif '檔案' in message:
-                    error_type = '檔案錯誤'
-                elif '權限' in message:
-                    error_type = '權限錯誤'
-                else:
-                    error_type = '其他錯誤'
-                
-                stats['by_error_type'][error_type] = stats['by_error_type'].get(error_type, 0) + 1
+                error_type = next(
+                    (error_type for keyword, error_type in ERROR_TYPE_KEYWORDS if keyword in message),
+                    '其他錯誤'
+                )
+                by_error_type[error_type] = by_error_type.get(error_type, 0) + 1
         
         return stats
     
     def _format_duration(self, seconds: float) -> str:
         """格式化時間長度"""
-        if seconds < 60:
-            return f"{seconds:.1f} 秒"
-        elif seconds < 3600:
-            minutes = seconds / 60
-            return f"{minutes:.1f} 分鐘"
-        else:
-            hours = seconds / 3600
-            return f"{hours:.1f} 小時"
+        for threshold, divisor, unit in DURATION_UNITS:
+            if seconds < threshold:
+                return f"{seconds / divisor:.1f} {unit}"
+        
+        # NaN 無法與任何上限比較，沿用最大單位
+        return f"{seconds / DURATION_UNITS[-1][1]:.1f} {DURATION_UNITS[-1][2]}"
     
     def cleanup_old_reports(self, keep_days: int = 30):
         """清理舊報表"""
         try:
-            cutoff_date = datetime.now() - timedelta(days=keep_days)
-            report_files = list(self.report_dir.glob("report_*"))
+            cutoff_ts = int((datetime.now() - timedelta(days=keep_days)).strftime("%Y%m%d%H%M%S"))
             
+            # 單次走訪報表資料夾，直接從檔名 (report_YYYYMMDD_HHMMSS.*) 取出時間戳
             deleted_count = 0
-            for report_file in report_files:
-                try:
-                    # 從檔案名稱提取時間戳
-                    timestamp_str = report_file.stem.split('_', 1)[1]
-                    file_date = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                    
-                    if file_date < cutoff_date:
-                        report_file.unlink()
-                        deleted_count += 1
-                except (ValueError, IndexError):
-                    continue
+            with os.scandir(self.report_dir) as it:
+                for entry in it:
+                    if not entry.name.startswith('report_'):
+                        continue
+                    try:
+                        if timestamp_to_int(entry.name[len('report_'):len('report_') + 15]) < cutoff_ts:
+                            os.unlink(entry.path)
+                            deleted_count += 1
+                    except (ValueError, OSError):
+                        continue
             
             if deleted_count > 0:
                 self.logger.info(f"已清理 {deleted_count} 個舊報表檔案")
@@ -15,11 +15,17 @@ import shutil
 from pathlib import Path
 
 
-def run_command(command, description=""):
-    """執行命令並處理錯誤"""
+def run_command(argv, description=""):
+    """
+    執行命令並處理錯誤
+    
+    Args:
+        argv: 命令及參數清單 (不經過 shell，參數不需另外加引號)
+        description: 顯示的說明文字
+    """
     try:
-        print(f"執行: {description or command}")
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+        print(f"執行: {description or ' '.join(argv)}")
+        result = subprocess.run(argv, check=True, capture_output=True, text=True)
         if result.stdout:
             print(f"輸出: {result.stdout.strip()}")
         return True
@@ -28,12 +34,17 @@ def run_command(command, description=""):
         if e.stderr:
             print(f"錯誤訊息: {e.stderr.strip()}")
         return False
+    except FileNotFoundError as e:
+        # 不經過 shell 時，找不到命令會直接拋出例外
+        print(f"錯誤: {e}")
+        return False
 
 
 def check_git_installed():
     """檢查 Git 是否已安裝"""
     try:
-        result = subprocess.run(['git', '--version'], capture_output=True, text=True)
+        # 需要顯示版本字串，只擷取 stdout
+        result = subprocess.run(['git', '--version'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
         if result.returncode == 0:
             print(f"✓ Git 已安裝: {result.stdout.strip()}")
             return True
@@ -51,40 +62,72 @@ def init_git_repo():
         print("✓ Git 倉庫已存在")
         return True
     
-    if not run_command('git init', "初始化 Git 倉庫"):
+    if not run_command(['git', 'init'], "初始化 Git 倉庫"):
         return False
     
     print("✓ Git 倉庫初始化完成")
     return True
 
 
+def get_local_config():
+    """
+    一次讀取倉庫的本機 Git 設定
+    
+    Returns:
+        dict: 設定鍵 -> 值，無法讀取時為空字典
+    """
+    try:
+        result = subprocess.run(['git', 'config', '--local', '--list', '-z'],
+                                check=True, capture_output=True, text=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return {}
+    
+    # -z 輸出格式: 每筆為 "鍵\n值"，以 NUL 分隔
+    config = {}
+    for item in result.stdout.split('\0'):
+        key, _, value = item.partition('\n')
+        if key:
+            config[key] = value
+    return config
+
+
 def setup_git_config():
     """設定 Git 配置"""
     print("\n設定 Git 配置...")
     
     # 設定使用者名稱和郵箱 (如果未設定)
     try:
-        subprocess.run(['git', 'config', 'user.name'], check=True, capture_output=True)
+        subprocess.run(['git', 'config', 'user.name'], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         print("✓ Git 使用者名稱已設定")
     except subprocess.CalledProcessError:
         print("請設定 Git 使用者名稱:")
         name = input("使用者名稱: ").strip()
         if name:
-            run_command(f'git config user.name "{name}"', "設定使用者名稱")
+            run_command(['git', 'config', 'user.name', name], "設定使用者名稱")
     
     try:
-        subprocess.run(['git', 'config', 'user.email'], check=True, capture_output=True)
+        subprocess.run(['git', 'config', 'user.email'], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         print("✓ Git 使用者郵箱已設定")
     except subprocess.CalledProcessError:
         print("請設定 Git 使用者郵箱:")
         email = input("使用者郵箱: ").strip()
         if email:
-            run_command(f'git config user.email "{email}"', "設定使用者郵箱")
+            run_command(['git', 'config', 'user.email', email], "設定使用者郵箱")
     
-    # 設定其他有用的配置
-    run_command('git config core.autocrlf true', "設定行尾符號處理")
-    run_command('git config core.safecrlf true', "設定行尾符號安全檢查")
-    run_command('git config pull.rebase false', "設定拉取策略")
+    # 設定其他有用的配置 (先一次讀取目前設定，只寫入尚未設定或值不同的項目)
+    desired_config = [
+        ('core.autocrlf', 'true', "設定行尾符號處理"),
+        ('core.safecrlf', 'true', "設定行尾符號安全檢查"),
+        ('pull.rebase', 'false', "設定拉取策略"),
+    ]
+    current_config = get_local_config()
+    for key, value, description in desired_config:
+        if current_config.get(key) == value:
+            print(f"✓ {key} 已設定")
+            continue
+        run_command(['git', 'config', key, value], description)
     
     return True
 
@@ -94,10 +137,14 @@ def create_gitkeep_files():
     directories = ['input', 'output', 'logs', 'report', 'tools']
     
     for dir_name in directories:
-        gitkeep_path = Path(dir_name) / '.gitkeep'
-        if not gitkeep_path.exists():
-            gitkeep_path.write_text('# 保持此資料夾在 Git 中\n', encoding='utf-8')
-            print(f"✓ 已建立 {gitkeep_path}")
+        gitkeep_path = os.path.join(dir_name, '.gitkeep')
+        # 以獨佔模式建立，檔案已存在時略過 (不需先檢查是否存在)
+        try:
+            with open(gitkeep_path, 'x', encoding='utf-8') as f:
+                f.write('# 保持此資料夾在 Git 中\n')
+        except FileExistsError:
+            continue
+        print(f"✓ 已建立 {gitkeep_path}")
     
     return True
 
@@ -128,14 +175,18 @@ def create_readme_files():
     }
     
     for folder_name, description in folder_descriptions.items():
-        readme_path = Path(folder_name) / 'README.md'
-        if not readme_path.exists():
-            content = readme_content.format(
-                folder_name=folder_name,
-                folder_description=description
-            )
-            readme_path.write_text(content, encoding='utf-8')
-            print(f"✓ 已建立 {readme_path}")
+        readme_path = os.path.join(folder_name, 'README.md')
+        content = readme_content.format(
+            folder_name=folder_name,
+            folder_description=description
+        )
+        # 以獨佔模式建立，檔案已存在時略過 (不需先檢查是否存在)
+        try:
+            with open(readme_path, 'x', encoding='utf-8') as f:
+                f.write(content)
+        except FileExistsError:
+            continue
+        print(f"✓ 已建立 {readme_path}")
     
     return True
 
@@ -153,14 +204,32 @@ def setup_git_hooks():
 
 echo "檢查敏感檔案..."
 
+# 只執行一次 git diff，再以 shell 內建的 case 比對副檔名 (不需另外執行 grep)
+secret_found=0
+office_found=0
+while IFS= read -r file; do
+    case "$file" in
+        *.passwords|*.keys|*.env)
+            echo "$file"
+            secret_found=1
+            ;;
+        *.xlsx|*.xls|*.zip|*.rar)
+            echo "$file"
+            office_found=1
+            ;;
+    esac
+done <<EOF
+$(git diff --cached --name-only)
+EOF
+
 # 檢查是否包含密碼檔案
-if git diff --cached --name-only | grep -E "\\.(passwords|keys|env)$"; then
+if [ "$secret_found" -eq 1 ]; then
     echo "錯誤: 檢測到敏感檔案，請移除後再提交"
     exit 1
 fi
 
 # 檢查是否包含 Excel 或壓縮檔案
-if git diff --cached --name-only | grep -E "\\.(xlsx|xls|zip|rar)$"; then
+if [ "$office_found" -eq 1 ]; then
     echo "錯誤: 檢測到 Excel 或壓縮檔案，請移除後再提交"
     exit 1
 fi
@@ -181,7 +250,7 @@ def initial_commit():
     print("\n準備進行初始提交...")
     
     # 添加所有檔案
-    if not run_command('git add .', "添加檔案到暫存區"):
+    if not run_command(['git', 'add', '.'], "添加檔案到暫存區"):
         return False
     
     # 檢查暫存區狀態
@@ -201,7 +270,7 @@ def initial_commit():
 - 建立專案結構和文件
 - 設定安全配置"""
     
-    if not run_command(f'git commit -m "{commit_message}"', "進行初始提交"):
+    if not run_command(['git', 'commit', '-m', commit_message], "進行初始提交"):
         return False
     
     print("✓ 初始提交完成")
@@ -216,14 +285,14 @@ def setup_remote_repo():
     if choice in ['y', 'yes', '是']:
         remote_url = input("請輸入遠端倉庫 URL: ").strip()
         if remote_url:
-            if run_command(f'git remote add origin {remote_url}', "添加遠端倉庫"):
+            if run_command(['git', 'remote', 'add', 'origin', remote_url], "添加遠端倉庫"):
                 print("✓ 遠端倉庫設定完成")
                 
                 # 詢問是否推送
                 print("是否要推送到遠端倉庫? (y/n): ", end="")
                 push_choice = input().strip().lower()
                 if push_choice in ['y', 'yes', '是']:
-                    run_command('git push -u origin main', "推送到遠端倉庫")
+                    run_command(['git', 'push', '-u', 'origin', 'main'], "推送到遠端倉庫")
     
     return True
 
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: src/timestamp_utils.py
+用途: 時間戳工具
+說明: 解析日誌與報表檔名中的 YYYYMMDD_HHMMSS 時間戳
+Authors: AI Assistant
+版本: 1.0 (2025-10-03)
+"""
+
+
+def timestamp_to_int(timestamp_str: str) -> int:
+    """
+    將 YYYYMMDD_HHMMSS 格式的時間戳轉為可比較的整數 (YYYYMMDDHHMMSS)
+    
+    格式固定，直接切片轉換，不需經過 datetime.strptime
+    
+    Args:
+        timestamp_str: 時間戳字串
+        
+    Returns:
+        int: 時間戳整數
+        
+    Raises:
+        ValueError: 格式不符
+    """
+    digits = timestamp_str[:8] + timestamp_str[9:]
+    if len(timestamp_str) != 15 or timestamp_str[8] != '_' or not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"無效的時間戳: {timestamp_str}")
+    return int(digits)